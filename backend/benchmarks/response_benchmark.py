@@ -0,0 +1,141 @@
+"""
+Response encoding benchmark for the backend.
+
+For a representative payload of each endpoint, compares the time FastAPI spends
+turning a returned dict into a body without a response model (jsonable_encoder
+plus JSONResponse.render) against the route's response model path (Pydantic
+validation plus dump_json straight to bytes), and bytes on the wire for full vs
+slim responses, uncompressed, gzip and (when installed) brotli.
+
+Usage:
+    python benchmarks/response_benchmark.py [--iterations 2000]
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main import COMPRESSION_MIN_SIZE, app, shape_response  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RESUME_TEXT = ("Experienced software engineer skilled in Python, FastAPI, React and PostgreSQL. "
+               "Built data pipelines and REST services deployed on AWS with Docker. ") * 27
+LLM_TEXT = ("1. Project Title: SkillSync - Adaptive Learning Planner Description: A web app that maps "
+            "resume skills to job requirements and schedules study sessions. ") * 20
+SKILLS = ["Python", "FastAPI", "React", "PostgreSQL", "Docker", "AWS", "Git", "REST APIs"]
+
+PAYLOADS = {
+    "/analyze_resume/": {
+        "missing_skills": LLM_TEXT[:1200],
+        "extracted_text": RESUME_TEXT[:4000],
+        "job_title": "Backend Engineer",
+        "analysis_timestamp": datetime.now().isoformat(),
+        "resume_length": len(RESUME_TEXT[:4000])
+    },
+    "/fetch_courses/{job_title}": {
+        "courses": [
+            {
+                "title": f"Backend Engineering Course {i}",
+                "link": f"https://www.coursera.org/learn/backend-{i}",
+                "snippet": "Learn Backend Engineer skills with this comprehensive course",
+                "platform": "Coursera",
+                "isFree": i % 2 == 0
+            }
+            for i in range(8)
+        ],
+        "job_title": "Backend Engineer",
+        "total_found": 8,
+        "search_timestamp": datetime.now().isoformat()
+    },
+    "/youtube-courses/{job_title}": {
+        "videos": [
+            {
+                "title": f"Backend Engineering Full Course {i}",
+                "video_id": f"abcdefgh{i:03d}",
+                "thumbnail": f"https://i.ytimg.com/vi/abcdefgh{i:03d}/hqdefault.jpg",
+                "channel": "Tech Channel",
+                "description": "A complete walkthrough of backend engineering fundamentals. " * 3,
+                "published_at": "2024-01-01T00:00:00Z",
+                "link": f"https://www.youtube.com/watch?v=abcdefgh{i:03d}"
+            }
+            for i in range(12)
+        ],
+        "job_title": "Backend Engineer",
+        "total_found": 12,
+        "search_timestamp": datetime.now().isoformat()
+    },
+    "/job_matching/": {
+        "job_recommendations": LLM_TEXT,
+        "skills_analyzed": SKILLS,
+        "job_title": "Backend Engineer",
+        "analysis_timestamp": datetime.now().isoformat(),
+        "total_skills": len(SKILLS)
+    },
+    "/project_generator/": {
+        "project_ideas": LLM_TEXT,
+        "skills_analyzed": SKILLS,
+        "analysis_timestamp": datetime.now().isoformat(),
+        "total_skills": len(SKILLS)
+    },
+}
+
+
+def encode_without_model(payload):
+    # What FastAPI does for a route with no response model or return type
+    return JSONResponse(content=jsonable_encoder(payload)).body
+
+
+def response_model_encoder(endpoint):
+    # What FastAPI does for a route with a response model: validate, then dump_json to bytes
+    route = next(route for route in app.routes if getattr(route, "path", None) == endpoint)
+    adapter = TypeAdapter(route.response_model)
+    return lambda payload: adapter.dump_json(adapter.validate_python(payload), exclude_unset=True)
+
+
+def time_encoder(encode, payload, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        encode(payload)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def wire_size(body, encoding):
+    if len(body) < COMPRESSION_MIN_SIZE or encoding == "identity":
+        return len(body)
+    if encoding == "gzip":
+        return len(gzip.compress(body, compresslevel=9))
+    return len(brotli.compress(body, quality=4))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response serialization and payload size")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    encodings = ["identity", "gzip"] + (["br"] if brotli else [])
+
+    print(f"{'endpoint':30} {'dict us':>8} {'model us':>9}  " +
+          "  ".join(f"{mode + '/' + enc:>13}" for mode in ("full", "slim") for enc in encodings))
+    for endpoint, payload in PAYLOADS.items():
+        encode_with_model = response_model_encoder(endpoint)
+        dict_us = time_encoder(encode_without_model, payload, args.iterations)
+        model_us = time_encoder(encode_with_model, payload, args.iterations)
+        full_body = encode_with_model(payload)
+        slim_body = encode_with_model(shape_response(payload, slim=True))
+        sizes = [wire_size(body, enc) for body in (full_body, slim_body) for enc in encodings]
+        print(f"{endpoint:30} {dict_us:8.1f} {model_us:9.1f}  " + "  ".join(f"{size:>13}" for size in sizes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Startup-time benchmark for the backend.
+
+Measures how long it takes to import the app and how long a freshly launched
+server takes to answer /health. Exits non-zero if either exceeds its budget.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--production] [--runs 3]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import_time():
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main"], cwd=BACKEND_DIR, check=True)
+    return time.perf_counter() - started
+
+
+def measure_time_to_healthy(port, production, timeout):
+    command = [sys.executable, "main.py"]
+    if production:
+        command.append("--production")
+
+    env = {**os.environ, "PORT": str(port)}
+    started = time.perf_counter()
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited early with code {server.returncode}")
+            try:
+                if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except requests.RequestException:
+                pass
+            time.sleep(0.05)
+        raise RuntimeError(f"Server not healthy after {timeout}s")
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend startup time")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--production", action="store_true", help="Launch through the gunicorn prefork mode")
+    parser.add_argument("--max-import-seconds", type=float, default=3.0)
+    parser.add_argument("--max-healthy-seconds", type=float, default=15.0)
+    args = parser.parse_args()
+
+    import_times = [measure_import_time() for _ in range(args.runs)]
+    healthy_times = [measure_time_to_healthy(args.port, args.production, args.max_healthy_seconds * 2)
+                     for _ in range(args.runs)]
+
+    best_import = min(import_times)
+    best_healthy = min(healthy_times)
+    print(f"import main:          best {best_import:.3f}s  (runs: {', '.join(f'{t:.3f}' for t in import_times)})")
+    print(f"time to first /health: best {best_healthy:.3f}s  (runs: {', '.join(f'{t:.3f}' for t in healthy_times)})")
+
+    failed = False
+    if best_import > args.max_import_seconds:
+        print(f"FAIL: import time exceeds {args.max_import_seconds}s budget")
+        failed = True
+    if best_healthy > args.max_healthy_seconds:
+        print(f"FAIL: time to healthy exceeds {args.max_healthy_seconds}s budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
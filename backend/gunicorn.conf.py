@@ -0,0 +1,30 @@
+# Production launcher config: gunicorn -c gunicorn.conf.py main:app
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+# Bulkhead limits in main.BULKHEADS apply per worker, so each route admits up to workers x limit
+# requests in total. Lower BULKHEAD_<ROUTE>_LIMIT when raising WEB_CONCURRENCY.
+
+# Import main (and with it fitz and the prompt templates) once in the master before forking
+preload_app = True
+
+# Gemini calls time out after 30s, so give in-flight requests time to drain on restart/SIGTERM
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 40))
+timeout = int(os.getenv("WORKER_TIMEOUT", 60))
+keepalive = 5
+
+loglevel = "info"
+accesslog = "-"
+
+
+def when_ready(server):
+    server.log.info(f"Master ready, spawning {server.cfg.workers} workers")
+
+
+def post_fork(server, worker):
+    # Connection pools must not be shared across the fork; each worker opens its own during startup warm-up
+    from main import http_session
+    http_session.close()
@@ -1,49 +1,152 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Body, Request
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Body, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, validator
 from typing import List, Optional
+from contextlib import asynccontextmanager
 import fitz  # PyMuPDF
 from dotenv import load_dotenv
+import asyncio
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import re
 import time
 from datetime import datetime
 import logging
 
+# Load environment variables before local modules read them
+load_dotenv()
+
+import profiling
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Per-worker startup and shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true":
+        started = time.perf_counter()
+        await run_in_threadpool(warm_up_worker)
+        logger.info(f"Worker {os.getpid()} warmed up in {time.perf_counter() - started:.2f}s")
+    profiling.start_worker_admin_server()
+    yield
+    profiling.stop_worker_admin_server()
+    http_session.close()
+
 app = FastAPI(
     title="Skill Gap Analyzer API",
     description="AI-powered resume analysis and career guidance platform",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
-# Enhanced CORS configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "https://skill-up-topaz.vercel.app",
-        "http://localhost:3000",
-        "http://localhost:5173",  # Vite dev server
-        "https://localhost:3000"
-    ],
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
-)
-
-# Load environment variables
-load_dotenv()
+# Environment configuration
 gemini_key = os.getenv("GEMINI_API_KEY")
 google_key = os.getenv("GOOGLE_API_KEY")
 youtube_key = os.getenv("YOUTUBE_API_KEY")
 SEARCH_ENGINE_ID = os.getenv("SEARCH_ENGINE_ID")
 
+# Compress responses above a size threshold, preferring brotli when the client accepts it
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1000))
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, quality=4, minimum_size=COMPRESSION_MIN_SIZE, gzip_fallback=True)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+# Shared HTTP session so upstream calls reuse keep-alive connections
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=20))
+
+# Upstream hosts whose connection pools are opened before a worker takes traffic
+WARMUP_URLS = [
+    "https://generativelanguage.googleapis.com/",
+    "https://www.googleapis.com/",
+]
+
+# Per-route concurrency limits (bulkheads)
+class Bulkhead:
+    """Caps concurrent requests for a route and sheds requests that wait too long"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+
+    async def acquire(self) -> bool:
+        # Reject straight away when every slot is busy and the wait queue is full. Both counters
+        # update synchronously, so a burst arriving in one loop tick is still bounded.
+        if self.active + self.waiting >= self.max_concurrent + self.max_queue:
+            self.shed += 1
+            return False
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            return False
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "timeout_seconds": self.timeout,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "shed": self.shed
+        }
+
+def create_bulkhead(name: str, max_concurrent: int, max_queue: int, timeout: float) -> Bulkhead:
+    """Build a bulkhead, allowing BULKHEAD_<NAME>_LIMIT/_QUEUE/_TIMEOUT env overrides"""
+    prefix = f"BULKHEAD_{name.upper()}"
+    return Bulkhead(
+        name,
+        max_concurrent=int(os.getenv(f"{prefix}_LIMIT", max_concurrent)),
+        max_queue=int(os.getenv(f"{prefix}_QUEUE", max_queue)),
+        timeout=float(os.getenv(f"{prefix}_TIMEOUT", timeout))
+    )
+
+# Route prefix -> bulkhead. Routes not listed here (e.g. /health) are never limited.
+# Limits are per process: with N gunicorn workers a route admits up to N x limit requests,
+# and the stats in /health describe only the worker that answered (see worker_pid).
+BULKHEADS = {
+    "/analyze_resume/": create_bulkhead("analyze_resume", 4, 8, 5.0),
+    "/job_matching/": create_bulkhead("job_matching", 4, 8, 5.0),
+    "/project_generator/": create_bulkhead("project_generator", 4, 8, 5.0),
+    "/fetch_courses/": create_bulkhead("fetch_courses", 8, 16, 2.0),
+    "/youtube-courses/": create_bulkhead("youtube_courses", 8, 16, 2.0),
+}
+
+def get_bulkhead(path: str) -> Optional[Bulkhead]:
+    for prefix, bulkhead in BULKHEADS.items():
+        if path.startswith(prefix):
+            return bulkhead
+    return None
+
 # Pydantic models for request validation
 class SkillsRequest(BaseModel):
     skills: List[str]
@@ -91,6 +194,75 @@ class JobMatchingRequest(BaseModel):
             raise ValueError('Extracted text must be provided')
         return v.strip()
 
+# Response models - with a response model FastAPI serializes straight to JSON bytes via Pydantic.
+# Every field is optional and routes set response_model_exclude_unset, so keys trimmed by
+# shape_response (and keys a branch never sets) stay out of the response.
+class Course(BaseModel):
+    title: str
+    link: str
+    snippet: str
+    platform: str
+    isFree: bool
+
+class Video(BaseModel):
+    title: str
+    video_id: str
+    thumbnail: str
+    channel: str
+    description: str
+    published_at: str
+    link: str
+
+class ResumeAnalysisResponse(BaseModel):
+    missing_skills: Optional[str] = None
+    extracted_text: Optional[str] = None
+    job_title: Optional[str] = None
+    analysis_timestamp: Optional[str] = None
+    resume_length: Optional[int] = None
+
+class CoursesResponse(BaseModel):
+    courses: Optional[List[Course]] = None
+    job_title: Optional[str] = None
+    total_found: Optional[int] = None
+    search_timestamp: Optional[str] = None
+    error: Optional[str] = None
+
+class YouTubeCoursesResponse(BaseModel):
+    videos: Optional[List[Video]] = None
+    job_title: Optional[str] = None
+    total_found: Optional[int] = None
+    search_timestamp: Optional[str] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+class JobMatchingResponse(BaseModel):
+    job_recommendations: Optional[str] = None
+    skills_analyzed: Optional[List[str]] = None
+    job_title: Optional[str] = None
+    analysis_timestamp: Optional[str] = None
+    total_skills: Optional[int] = None
+    error: Optional[str] = None
+
+class ProjectIdeasResponse(BaseModel):
+    project_ideas: Optional[str] = None
+    skills_analyzed: Optional[List[str]] = None
+    analysis_timestamp: Optional[str] = None
+    total_skills: Optional[int] = None
+    error: Optional[str] = None
+
+# Echoed inputs that slim mode leaves out of responses
+SLIM_EXCLUDED_FIELDS = {"extracted_text", "skills_analyzed"}
+
+def shape_response(payload: dict, fields: Optional[str] = None, slim: bool = False) -> dict:
+    """Trim a response to the requested comma-separated fields, or drop echoed inputs in slim mode"""
+    if fields:
+        wanted = {field.strip() for field in fields.split(",") if field.strip()}
+        # Always keep error details so clients can tell a failure apart from a trimmed response
+        return {key: value for key, value in payload.items() if key in wanted or key == "error"}
+    if slim:
+        return {key: value for key, value in payload.items() if key not in SLIM_EXCLUDED_FIELDS}
+    return payload
+
 # Enhanced error handling
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -117,22 +289,46 @@ async def general_exception_handler(request: Request, exc: Exception):
         }
     )
 
+# Admin-only profiling hooks, registered only when ADMIN_TOKEN is set so they cost nothing otherwise
+if profiling.ADMIN_TOKEN:
+    app.include_router(profiling.router)
+    app.add_middleware(profiling.ProfileRequestMiddleware)
+    logger.info("Admin profiling endpoints enabled under /admin")
+
+# Per-worker warm-up, runs before the worker accepts traffic
+def warm_up_worker():
+    # Exercise PyMuPDF once so the first resume upload does not pay for lazy initialisation
+    try:
+        with fitz.open() as pdf:
+            pdf.new_page().insert_text((72, 72), "warm up")
+            extract_text_from_pdf(pdf.tobytes())
+    except Exception as e:
+        logger.warning(f"PDF warm-up failed: {str(e)}")
+
+    for url in WARMUP_URLS:
+        try:
+            http_session.head(url, timeout=3)
+        except Exception as e:
+            logger.warning(f"Connection warm-up failed for {url}: {str(e)}")
+
 # Health check endpoint
 @app.get("/health")
-def health_check():
+def health_check() -> dict:
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "version": "2.0.0",
+        "worker_pid": os.getpid(),
         "services": {
             "gemini_api": "configured" if gemini_key else "not_configured",
             "google_api": "configured" if google_key else "not_configured",
             "youtube_api": "configured" if youtube_key else "not_configured"
-        }
+        },
+        "bulkheads": {bulkhead.name: bulkhead.stats() for bulkhead in BULKHEADS.values()}
     }
 
 @app.get("/")
-def home():
+def home() -> dict:
     return {
         "message": "Skill Gap Analyzer API",
         "version": "2.0.0",
@@ -179,8 +375,9 @@ def clean_gemini_response(text):
     text = re.sub(r'\s+', ' ', text)
     
     return text.strip()
-@app.post("/analyze_resume/")
-async def analyze_resume(file: UploadFile = File(...), job_title: str = Form(...)):
+@app.post("/analyze_resume/", response_model=ResumeAnalysisResponse, response_model_exclude_unset=True)
+async def analyze_resume(file: UploadFile = File(...), job_title: str = Form(...),
+                         fields: Optional[str] = Query(None), slim: bool = Query(False)):
     try:
         # Validate file type
         if not file.filename.lower().endswith('.pdf'):
@@ -195,7 +392,8 @@ async def analyze_resume(file: UploadFile = File(...), job_title: str = Form(...
         if not job_title or len(job_title.strip()) < 2:
             raise HTTPException(status_code=400, detail="Valid job title is required")
         
-        extracted_text = extract_text_from_pdf(file_content)
+        # PDF parsing is CPU-bound, keep it off the event loop
+        extracted_text = await profiling.run_profiled(extract_text_from_pdf, file_content)
         
         if not extracted_text.strip():
             raise HTTPException(status_code=400, detail="Could not extract text from PDF")
@@ -241,7 +439,8 @@ Provide ONLY the bullet-point list, no additional text or explanations.
         url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={gemini_key}"
         headers = {"Content-Type": "application/json"}
 
-        response = requests.post(url, headers=headers, json=prompt, timeout=30)
+        # Run the blocking Gemini call off the event loop so other routes keep serving
+        response = await profiling.run_profiled(http_session.post, url, headers=headers, json=prompt, timeout=30)
 
         if response.status_code == 200:
             response_json = response.json()
@@ -257,13 +456,13 @@ Provide ONLY the bullet-point list, no additional text or explanations.
             skill_gap = "- Unable to analyze resume at this time\n- Please try again later"
 
         # IMPORTANT: Return both missing skills AND extracted text
-        return {
+        return shape_response({
             "missing_skills": skill_gap,
             "extracted_text": extracted_text,  # This is crucial for job matching
             "job_title": job_title,
             "analysis_timestamp": datetime.now().isoformat(),
             "resume_length": len(extracted_text)
-        }
+        }, fields, slim)
 
     except HTTPException:
         raise
@@ -271,8 +470,9 @@ Provide ONLY the bullet-point list, no additional text or explanations.
         logger.error(f"Resume analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to analyze resume")
 
-@app.get("/fetch_courses/{job_title}")
-def fetch_courses(job_title: str):
+@app.get("/fetch_courses/{job_title}", response_model=CoursesResponse, response_model_exclude_unset=True)
+@profiling.profiled
+def fetch_courses(job_title: str, fields: Optional[str] = Query(None), slim: bool = Query(False)):
     try:
         if not job_title or len(job_title.strip()) < 2:
             raise HTTPException(status_code=400, detail="Valid job title is required")
@@ -298,7 +498,7 @@ def fetch_courses(job_title: str):
                     "safe": "active"
                 }
 
-                response = requests.get(search_url, params=params, timeout=10)
+                response = http_session.get(search_url, params=params, timeout=10)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -359,23 +559,23 @@ def fetch_courses(job_title: str):
         # Limit to 8 courses and prioritize free ones
         all_courses = sorted(all_courses, key=lambda x: (not x.get("isFree", False), x["title"]))[:8]
         
-        return {
+        return shape_response({
             "courses": all_courses,
             "job_title": job_title,
             "total_found": len(all_courses),
             "search_timestamp": datetime.now().isoformat()
-        }
+        }, fields, slim)
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Course fetch error: {str(e)}")
-        return {
+        return shape_response({
             "courses": get_fallback_courses(job_title),
             "job_title": job_title,
             "total_found": 0,
             "error": "Using fallback courses due to API limitations"
-        }
+        }, fields, slim)
 
 def get_fallback_courses(job_title: str) -> List[dict]:
     """Provide curated fallback courses based on job title"""
@@ -426,8 +626,9 @@ def get_fallback_courses(job_title: str) -> List[dict]:
         }
     ]
 
-@app.get("/youtube-courses/{job_title}")
-def get_youtube_courses(job_title: str):
+@app.get("/youtube-courses/{job_title}", response_model=YouTubeCoursesResponse, response_model_exclude_unset=True)
+@profiling.profiled
+def get_youtube_courses(job_title: str, fields: Optional[str] = Query(None), slim: bool = Query(False)):
     try:
         if not job_title or len(job_title.strip()) < 2:
             raise HTTPException(status_code=400, detail="Valid job title is required")
@@ -447,24 +648,24 @@ def get_youtube_courses(job_title: str):
             "safeSearch": "strict"
         }
 
-        response = requests.get(youtube_url, params=params, timeout=10)
+        response = http_session.get(youtube_url, params=params, timeout=10)
         
         if response.status_code != 200:
             logger.error(f"YouTube API error: {response.text}")
-            return {
+            return shape_response({
                 "videos": [],
                 "job_title": job_title,
                 "error": "YouTube API temporarily unavailable"
-            }
+            }, fields, slim)
         
         data = response.json()
 
         if "items" not in data or not data["items"]:
-            return {
+            return shape_response({
                 "videos": [],
                 "job_title": job_title,
                 "message": f"No YouTube videos found for {job_title}"
-            }
+            }, fields, slim)
 
         videos = []
         for item in data.get("items", []):
@@ -480,26 +681,26 @@ def get_youtube_courses(job_title: str):
                 }
                 videos.append(video)
 
-        return {
+        return shape_response({
             "videos": videos,
             "job_title": job_title,
             "total_found": len(videos),
             "search_timestamp": datetime.now().isoformat()
-        }
+        }, fields, slim)
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"YouTube fetch error: {str(e)}")
-        return {
+        return shape_response({
             "videos": [],
             "job_title": job_title,
             "error": f"Failed to fetch YouTube videos: {str(e)}"
-        }
+        }, fields, slim)
 
 # FIXED: Job Matching Endpoint - Only the job matching part
-@app.post("/job_matching/")
-async def job_matching(request: dict):
+@app.post("/job_matching/", response_model=JobMatchingResponse, response_model_exclude_unset=True)
+async def job_matching(request: dict, fields: Optional[str] = Query(None), slim: bool = Query(False)):
     try:
         # Extract data from request
         skills = request.get("skills", [])
@@ -586,7 +787,8 @@ Generate 5 unique, personalized job recommendations now:
         logger.info(f"Skills count: {len(skills)}")
         logger.info(f"Resume text length: {len(extracted_text)}")
 
-        response = requests.post(url, headers=headers, json=prompt, timeout=30)
+        # Run the blocking Gemini call off the event loop so other routes keep serving
+        response = await profiling.run_profiled(http_session.post, url, headers=headers, json=prompt, timeout=30)
 
         if response.status_code == 200:
             response_json = response.json()
@@ -607,25 +809,25 @@ Generate 5 unique, personalized job recommendations now:
             logger.error(f"Gemini API error: Status {response.status_code}, Response: {response.text}")
             job_recommendations = "Unable to generate job recommendations due to API error. Please try again."
 
-        return {
+        return shape_response({
             "job_recommendations": job_recommendations,
             "skills_analyzed": skills,
             "job_title": job_title,
             "analysis_timestamp": datetime.now().isoformat(),
             "total_skills": len(skills)
-        }
+        }, fields, slim)
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Job matching error: {str(e)}")
-        return {
+        return shape_response({
             "job_recommendations": "Unable to generate job recommendations due to system error. Please try again.",
             "error": str(e)
-        }
+        }, fields, slim)
 
-@app.post("/project_generator/")
-async def project_generator(request: SkillsRequest):
+@app.post("/project_generator/", response_model=ProjectIdeasResponse, response_model_exclude_unset=True)
+async def project_generator(request: SkillsRequest, fields: Optional[str] = Query(None), slim: bool = Query(False)):
     try:
         skills = request.skills
         
@@ -680,7 +882,8 @@ Generate 5 unique project ideas with creative, catchy titles that would impress
         url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={gemini_key}"
         headers = {"Content-Type": "application/json"}
 
-        response = requests.post(url, headers=headers, json=prompt, timeout=30)
+        # Run the blocking Gemini call off the event loop so other routes keep serving
+        response = await profiling.run_profiled(http_session.post, url, headers=headers, json=prompt, timeout=30)
 
         if response.status_code == 200:
             response_json = response.json()
@@ -696,19 +899,19 @@ Generate 5 unique project ideas with creative, catchy titles that would impress
             logger.error(f"Gemini API error: {response.text}")
             project_ideas = "Unable to generate project ideas due to API error. Please try again."
 
-        return {
+        return shape_response({
             "project_ideas": project_ideas,
             "skills_analyzed": skills,
             "analysis_timestamp": datetime.now().isoformat(),
             "total_skills": len(skills)
-        }
+        }, fields, slim)
 
     except Exception as e:
         logger.error(f"Project generation error: {str(e)}")
-        return {
+        return shape_response({
             "project_ideas": "Unable to generate project ideas due to system error. Please try again.",
             "error": str(e)
-        }
+        }, fields, slim)
 # Rate limiting middleware (basic implementation)
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
@@ -718,7 +921,61 @@ async def rate_limit_middleware(request: Request, call_next):
     response.headers["X-RateLimit-Remaining"] = "99"
     return response
 
+# Admission control - shed requests that cannot get a bulkhead slot in time
+@app.middleware("http")
+async def bulkhead_middleware(request: Request, call_next):
+    bulkhead = get_bulkhead(request.url.path)
+    if bulkhead is None or request.method == "OPTIONS":
+        return await call_next(request)
+
+    if not await bulkhead.acquire():
+        logger.warning(f"Shedding request to {request.url.path}: bulkhead '{bulkhead.name}' saturated")
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": str(max(1, int(bulkhead.timeout)))},
+            content={
+                "error": True,
+                "message": "Service busy, please try again shortly",
+                "timestamp": datetime.now().isoformat(),
+                "path": str(request.url)
+            }
+        )
+
+    try:
+        return await call_next(request)
+    finally:
+        bulkhead.release()
+
+# Enhanced CORS configuration
+# Registered after the http middlewares so it is outermost and also covers 503s from bulkhead shedding
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=[
+        "https://skill-up-topaz.vercel.app",
+        "http://localhost:3000",
+        "http://localhost:5173",  # Vite dev server
+        "https://localhost:3000"
+    ],
+    allow_credentials=True,
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["*"],
+    expose_headers=["Retry-After"],
+)
+
 if __name__ == "__main__":
+    import sys
+
+    if "--production" in sys.argv or os.getenv("APP_ENV") == "production":
+        # Prefork workers from a preloaded app, see gunicorn.conf.py
+        backend_dir = os.path.dirname(os.path.abspath(__file__))
+        # Run gunicorn through this interpreter so an unactivated venv still works
+        os.execv(sys.executable, [
+            sys.executable, "-m", "gunicorn",
+            "--chdir", backend_dir,
+            "--config", os.path.join(backend_dir, "gunicorn.conf.py"),
+            "main:app"
+        ])
+
     import uvicorn
     uvicorn.run(
         app, 
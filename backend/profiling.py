@@ -0,0 +1,364 @@
+"""
+Admin-only profiling hooks for a live worker.
+
+Nothing here is registered unless ADMIN_TOKEN is set, so the service pays no
+overhead when profiling is disabled. Every route requires the X-Admin-Token
+header.
+
+With multiple workers a call on the public port lands on an arbitrary worker,
+and a keep-alive connection stays on the same one. To reach a given worker:
+
+- set ADMIN_SOCKET_DIR, and each worker also serves the admin routes on
+  <ADMIN_SOCKET_DIR>/worker-<pid>.sock from its own thread, e.g.
+  curl --unix-socket /tmp/skillup-admin/worker-1234.sock -H "X-Admin-Token: ..." \
+      http://worker/admin/profile/cpu
+  This also answers when the worker's event loop is stuck.
+- or pass worker=<pid> on the public port. Any other worker answers 421, and
+  each retry must use a new connection (Connection: close) to land elsewhere.
+"""
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from starlette.datastructures import MutableHeaders
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+import functools
+import os
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+ADMIN_SOCKET_DIR = os.getenv("ADMIN_SOCKET_DIR")
+
+# How often a profiled request's threads are sampled
+REQUEST_SAMPLE_INTERVAL = 0.002
+
+# Leaf frames of threads that are blocked waiting rather than running (idle workers, the idle event loop)
+IDLE_LEAF_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("runners.py", "run"),  # uvloop waits in C below asyncio.run
+}
+
+# Per-request profiles kept for retrieval, oldest dropped first
+request_profiles = deque(maxlen=20)
+
+# Profile of the request currently being handled, propagated into threadpool calls
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+# Snapshot that the next tracemalloc diff is taken against
+_last_snapshot = None
+_snapshot_lock = threading.Lock()
+
+# Per-worker admin server on a Unix socket
+_admin_server = None
+_admin_thread = None
+
+
+def is_admin(token: Optional[str]) -> bool:
+    # Compare bytes: compare_digest rejects non-ASCII str. Headers arrive decoded as latin-1,
+    # so re-encoding them as latin-1 gives the raw bytes the client sent.
+    return (bool(ADMIN_TOKEN) and token is not None
+            and secrets.compare_digest(token.encode("latin-1"), ADMIN_TOKEN.encode()))
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def require_worker(worker: Optional[int] = Query(None)):
+    if worker is not None and worker != os.getpid():
+        raise HTTPException(
+            status_code=421,
+            detail=f"Reached worker {os.getpid()}, not {worker}; retry on a new connection (Connection: close) "
+                   f"or use the worker's admin socket"
+        )
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin), Depends(require_worker)])
+
+
+def _collapse_stack(frame, stop_code=None) -> str:
+    parts = []
+    while frame is not None and frame.f_code is not stop_code:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_LEAF_FRAMES
+
+
+def sample_cpu(seconds: float, interval: float, include_idle: bool = False) -> Counter:
+    """Sample every thread's stack and count identical stacks in collapsed (flame graph) form"""
+    own_thread = threading.get_ident()
+    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread or (not include_idle and _is_idle(frame)):
+                continue
+            thread_name = thread_names.get(thread_id, str(thread_id))
+            stacks[f"{thread_name};{_collapse_stack(frame)}"] += 1
+        time.sleep(interval)
+    return stacks
+
+
+@router.get("/profile/cpu", response_class=PlainTextResponse)
+def profile_cpu(seconds: float = Query(10, gt=0, le=60), interval_ms: float = Query(5, ge=1, le=100),
+                include_idle: bool = Query(False)):
+    """
+    Sample this worker's threads for N seconds; output feeds flamegraph.pl or speedscope directly.
+    Samples are wall-clock, so threads blocked waiting are dropped unless include_idle is set.
+    """
+    logger.info(f"CPU sampling worker {os.getpid()} for {seconds}s")
+    stacks = sample_cpu(seconds, interval_ms / 1000, include_idle)
+    return PlainTextResponse(
+        "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()),
+        headers={"X-Profile-Worker": str(os.getpid())}
+    )
+
+
+def _take_snapshot():
+    # Leave out tracemalloc's own and import machinery allocations
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+
+
+@router.post("/tracemalloc/start")
+def tracemalloc_start(frames: int = Query(10, ge=1, le=50)):
+    global _last_snapshot
+    with _snapshot_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _last_snapshot = _take_snapshot()
+    return {"tracing": True, "frames": tracemalloc.get_traceback_limit(), "worker": os.getpid()}
+
+
+@router.post("/tracemalloc/stop")
+def tracemalloc_stop():
+    global _last_snapshot
+    with _snapshot_lock:
+        tracemalloc.stop()
+        _last_snapshot = None
+    return {"tracing": False, "worker": os.getpid()}
+
+
+def _format_stat(stat) -> dict:
+    frame = stat.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_kb": round(stat.size / 1024, 1),
+        "count": stat.count
+    }
+
+
+@router.get("/tracemalloc/snapshot")
+def tracemalloc_snapshot(limit: int = Query(20, ge=1, le=200), diff: bool = Query(True)):
+    """Top allocation sites, plus growth since the previous snapshot when diff is set"""
+    global _last_snapshot
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=409, detail="tracemalloc is not running, POST /admin/tracemalloc/start first")
+
+    with _snapshot_lock:
+        snapshot = _take_snapshot()
+        previous, _last_snapshot = _last_snapshot, snapshot
+
+    current, peak = tracemalloc.get_traced_memory()
+    result = {
+        "worker": os.getpid(),
+        "traced_kb": round(current / 1024, 1),
+        "peak_kb": round(peak / 1024, 1),
+        "top": [_format_stat(stat) for stat in snapshot.statistics("lineno")[:limit]]
+    }
+    if diff and previous is not None:
+        result["diff"] = [
+            {**_format_stat(stat), "size_diff_kb": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff}
+            for stat in snapshot.compare_to(previous, "lineno")[:limit]
+        ]
+    return result
+
+
+class RequestProfile:
+    """Samples only the threads currently running work for one request"""
+
+    def __init__(self, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.path = path
+        self.stacks = Counter()
+        self.samples = 0
+        self.duration_ms = None
+        self._started = time.perf_counter()
+        self._threads = set()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name=f"request-profiler-{self.id}", daemon=True)
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        if self._done.is_set():
+            return
+        self._done.set()
+        self._sampler.join()
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 1)
+
+    @contextmanager
+    def track(self):
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._threads.add(thread_id)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads.discard(thread_id)
+
+    def _sample(self):
+        while not self._done.wait(REQUEST_SAMPLE_INTERVAL):
+            with self._lock:
+                threads = list(self._threads)
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            for thread_id in threads:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[_collapse_stack(frame, stop_code=profile_call.__code__)] += 1
+                    self.samples += 1
+
+
+def profile_call(func, *args, **kwargs):
+    """Run func, sampling this thread if the current request is being profiled"""
+    profile = _current_profile.get()
+    if profile is None:
+        return func(*args, **kwargs)
+    with profile.track():
+        return func(*args, **kwargs)
+
+
+async def run_profiled(func, *args, **kwargs):
+    """run_in_threadpool that includes the call in the current request's profile"""
+    return await run_in_threadpool(profile_call, func, *args, **kwargs)
+
+
+def profiled(func):
+    """Decorator for sync endpoints so their threadpool execution is included in request profiles"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return profile_call(func, *args, **kwargs)
+    return wrapper
+
+
+@router.get("/profile/requests")
+def list_request_profiles():
+    return {
+        "worker": os.getpid(),
+        "profiles": [
+            {"id": profile.id, "path": profile.path, "duration_ms": profile.duration_ms, "samples": profile.samples}
+            for profile in list(request_profiles)  # copy: the event loop appends concurrently
+        ]
+    }
+
+
+@router.get("/profile/requests/{profile_id}", response_class=PlainTextResponse)
+def get_request_profile(profile_id: str):
+    """Collapsed stacks of one request's threadpool work, for flamegraph.pl or speedscope"""
+    for profile in list(request_profiles):
+        if profile.id == profile_id:
+            return "\n".join(f"{stack} {count}" for stack, count in profile.stacks.most_common())
+    raise HTTPException(status_code=404, detail="Profile not found on this worker")
+
+
+class ProfileRequestMiddleware:
+    """
+    Profile a single request when it carries X-Profile: 1 and a valid admin token.
+
+    Only threadpool work is sampled (sync endpoints and calls made through
+    run_profiled), since the event loop thread interleaves other requests.
+    A profile with no samples gets no X-Profile-Id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(name == b"x-profile" for name, _ in scope["headers"]):
+            return await self.app(scope, receive, send)
+
+        headers = {name: value.decode("latin-1") for name, value in scope["headers"]}
+        if headers.get(b"x-profile") != "1" or not is_admin(headers.get(b"x-admin-token")):
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(scope["path"])
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                profile.stop()
+                response_headers = MutableHeaders(scope=message)
+                response_headers.append("X-Profile-Worker", str(os.getpid()))
+                if profile.samples:
+                    request_profiles.append(profile)
+                    response_headers.append("X-Profile-Id", profile.id)
+            await send(message)
+
+        token = _current_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            profile.stop()
+            _current_profile.reset(token)
+
+
+def start_worker_admin_server():
+    """Serve the admin routes on this worker's own Unix socket when ADMIN_SOCKET_DIR is set"""
+    global _admin_server, _admin_thread
+    if not (ADMIN_TOKEN and ADMIN_SOCKET_DIR):
+        return
+    import uvicorn
+
+    os.makedirs(ADMIN_SOCKET_DIR, mode=0o700, exist_ok=True)
+    admin_app = FastAPI(title="Skill Gap Analyzer admin")
+    admin_app.include_router(router)
+    config = uvicorn.Config(
+        admin_app,
+        uds=os.path.join(ADMIN_SOCKET_DIR, f"worker-{os.getpid()}.sock"),
+        lifespan="off",
+        log_config=None,
+        log_level="warning"
+    )
+    # Off the main thread uvicorn leaves signal handling to the worker
+    _admin_server = uvicorn.Server(config)
+    _admin_thread = threading.Thread(target=_admin_server.run, name="admin-server", daemon=True)
+    _admin_thread.start()
+    logger.info(f"Admin socket for worker {os.getpid()} at {config.uds}")
+
+
+def stop_worker_admin_server():
+    global _admin_server, _admin_thread
+    if _admin_server is None:
+        return
+    _admin_server.should_exit = True
+    _admin_thread.join(timeout=5)
+    if os.path.exists(_admin_server.config.uds):
+        os.unlink(_admin_server.config.uds)
+    _admin_server = _admin_thread = None
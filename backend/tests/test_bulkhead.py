@@ -0,0 +1,88 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+
+ORIGIN = "https://skill-up-topaz.vercel.app"
+
+
+async def hold_slot(bulkhead, seconds):
+    if not await bulkhead.acquire():
+        return False
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        bulkhead.release()
+    return True
+
+
+def test_burst_beyond_queue_is_shed():
+    async def burst():
+        bulkhead = main.Bulkhead("burst", max_concurrent=4, max_queue=8, timeout=1.0)
+        results = await asyncio.gather(*[hold_slot(bulkhead, 0.05) for _ in range(20)])
+        return bulkhead, results
+
+    bulkhead, results = asyncio.run(burst())
+
+    assert results.count(True) == 12
+    assert results.count(False) == 8
+    assert bulkhead.admitted == 12
+    assert bulkhead.shed == 8
+
+
+def test_queue_depth_never_exceeds_limit():
+    async def burst():
+        bulkhead = main.Bulkhead("depth", max_concurrent=2, max_queue=3, timeout=1.0)
+        tasks = [asyncio.create_task(hold_slot(bulkhead, 0.05)) for _ in range(10)]
+        await asyncio.sleep(0.01)
+        stats = bulkhead.stats()
+        await asyncio.gather(*tasks)
+        return stats
+
+    stats = asyncio.run(burst())
+
+    assert stats["active"] == 2
+    assert stats["queue_depth"] == 3
+    assert stats["shed"] == 5
+
+
+def test_waiter_is_shed_after_deadline():
+    async def wait_past_deadline():
+        bulkhead = main.Bulkhead("deadline", max_concurrent=1, max_queue=1, timeout=0.05)
+        results = await asyncio.gather(hold_slot(bulkhead, 0.2), hold_slot(bulkhead, 0))
+        return bulkhead, results
+
+    bulkhead, results = asyncio.run(wait_past_deadline())
+
+    assert results == [True, False]
+    assert bulkhead.shed == 1
+    assert bulkhead.waiting == 0
+
+
+def test_slots_are_released_after_handler():
+    async def sequential():
+        bulkhead = main.Bulkhead("release", max_concurrent=1, max_queue=0, timeout=0.05)
+        results = [await hold_slot(bulkhead, 0) for _ in range(3)]
+        return bulkhead, results
+
+    bulkhead, results = asyncio.run(sequential())
+
+    assert results == [True, True, True]
+    assert bulkhead.stats()["active"] == 0
+    assert bulkhead.admitted == 3
+    assert bulkhead.shed == 0
+
+
+def test_shed_response_carries_cors_headers(monkeypatch):
+    # A bulkhead with no slots and no queue sheds every request immediately
+    bulkhead = main.Bulkhead("youtube_courses", max_concurrent=0, max_queue=0, timeout=0.01)
+    monkeypatch.setitem(main.BULKHEADS, "/youtube-courses/", bulkhead)
+
+    response = TestClient(main.app).get("/youtube-courses/python", headers={"Origin": ORIGIN})
+
+    assert response.status_code == 503
+    assert response.headers["access-control-allow-origin"] == ORIGIN
+    assert "retry-after" in response.headers["access-control-expose-headers"].lower()
+    assert response.headers["retry-after"] == "1"
+    assert bulkhead.shed == 1